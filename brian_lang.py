@@ -2,11 +2,14 @@ from typing import Tuple
 from enum import Enum
 from lib import (
     LetterParser,
+    CharsetParser,
     OptionalParser,
     RepeatParser,
     LazyParser,
     ConvertToType,
     IgnoreParser,
+    SkipSpaces,
+    SpanParser,
 )
 from functools import reduce
 
@@ -22,21 +25,19 @@ FLOAT = float
 
 EXPRESSION = Tuple[OPERATOR, "EXPRESSION", "EXPRESSION"] | FLOAT
 
-AnyDigitParser = reduce(
-    lambda acc, x: acc | x, [LetterParser(str(i)) for i in range(10)]
-)
+AnyDigitParser = CharsetParser("0123456789")
 sign_parser = LetterParser("-")
 point_parser = LetterParser(".")
 float_parser = ConvertToType(
-    OptionalParser(sign_parser)
-    + RepeatParser(AnyDigitParser)
-    + OptionalParser(point_parser + RepeatParser(AnyDigitParser)),
-    lambda x: float("".join(x)),
-)
-operator_parser = reduce(
-    lambda acc, x: acc | x, [LetterParser(i) for i in ("+", "-", "*", "/")]
+    SpanParser(
+        OptionalParser(sign_parser)
+        + RepeatParser(AnyDigitParser)
+        + OptionalParser(point_parser + RepeatParser(AnyDigitParser))
+    ),
+    lambda x: float(x[0]),
 )
-space_parser = IgnoreParser(OptionalParser(RepeatParser(LetterParser(" "))))
+operator_parser = CharsetParser("+-*/")
+space_parser = SkipSpaces()
 expression_parser = (
     space_parser
     + (
@@ -56,6 +57,7 @@ expression_parser = (
                 + space_parser
                 + RepeatParser(LazyParser(lambda: expression_parser))
             ),
+            lambda x: x,
         )
     )
     + space_parser
@@ -1,6 +1,7 @@
+import re
 from abc import ABC
 from functools import reduce
-from typing import Union, List, Dict, Optional, Tuple, Any, Callable, TypeVar, Generic
+from typing import Union, List, Dict, Optional, Tuple, Any, Callable
 
 JSON = Union[str, float, bool, List["JSON"], Dict[str, "JSON"]]
 
@@ -8,44 +9,127 @@ JSON = Union[str, float, bool, List["JSON"], Dict[str, "JSON"]]
 # type class for parser combinators.
 # parser combinators are functions that take an input string and return a token and the rest of the string
 # parser combinators can be composed via + and (|| or *).
+# internally parsers never slice the input: they pass the original source string around
+# together with an integer offset and return (tokens, new offset). Slicing off one
+# character per step copied O(N) bytes per character parsed, O(N^2) for the whole input;
+# with offsets the source is allocated once and each step is an O(1) index.
+# the public parse(input_str) entry point keeps the original (tokens, rest of string)
+# contract by slicing once at the very end.
+# tokens are appended into one shared accumulator list threaded through the whole
+# parse instead of each sequence concatenating its children's lists: concatenation
+# made O(N^2) copies over a long parse, appending is O(N) total. On failure a parser's
+# appends are rolled back by truncating the accumulator to its entry length, which
+# the memoizing dispatch does centrally. Parsers whose tokens are going to be thrown
+# away (everything under an IgnoreParser, lookahead under NotParser, the inside of a
+# SpanParser) are run with discard=True and skip appending entirely instead of
+# building tokens that a wrapper deletes afterwards.
+# parse results are memoized packrat style, keyed on (parser, offset). The cache lives
+# for one top level parse call and is thrown away afterwards, which keeps backtracking
+# over nested alternatives (json_parser, expression_parser) linear instead of re-parsing
+# the same position with the same parser on every failed alternative.
 class ParserCombinator(ABC):
+    # no per-instance __dict__: grammars build hundreds of combinator instances and
+    # parse reads their attributes on every call, so fixed slots shrink instances and
+    # make those attribute loads a fixed offset lookup
+    __slots__ = ()
+
+    _cache: Dict[
+        Tuple["ParserCombinator", int, bool], Optional[Tuple[int, Tuple[Any, ...]]]
+    ] = {}
+    _depth: int = 0
+    # the packrat cache otherwise grows with the input. In practice backtracking only
+    # reaches a short distance behind the furthest offset the parse has committed to,
+    # so entries far behind it are periodically swept. An evicted entry is never a
+    # correctness problem, only a cache miss that gets recomputed.
+    _CACHE_WINDOW = 256
+    _SWEEP_INTERVAL = 4096
+    _high_pos: int = 0
+    _stores: int = 0
+
+    # public entry point, original contract: tokens plus the unconsumed rest of the string
     def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
+        tokens: List[Any] = []
+        pos = self.parse_at(input_str, 0, tokens)
+        if pos is None:
+            return None
+        return tokens, input_str[pos:]
+
+    # recursive entry point used by combinators, memoized: appends this parser's
+    # tokens to out and returns the new offset, or returns None with out untouched.
+    # discard=True promises the caller will never look at the tokens, so none are
+    # produced. Constant time parsers (LetterParser) override this directly and skip
+    # the cache. The flag is part of the cache key because the same (parser, offset)
+    # records different tokens in the two modes.
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        cache = ParserCombinator._cache
+        key = (self, pos, discard)
+        if key in cache:
+            cached = cache[key]
+            if cached is None:
+                return None
+            new_pos, tokens = cached
+            out.extend(tokens)
+            return new_pos
+        ParserCombinator._depth += 1
+        mark = len(out)
+        try:
+            new_pos = self._parse(source, pos, out, discard)
+            if new_pos is None:
+                # central rollback: a failing parser never leaves tokens behind
+                del out[mark:]
+                cache[key] = None
+            else:
+                cache[key] = (new_pos, tuple(out[mark:]))
+                if new_pos > ParserCombinator._high_pos:
+                    ParserCombinator._high_pos = new_pos
+                ParserCombinator._stores += 1
+                if ParserCombinator._stores >= ParserCombinator._SWEEP_INTERVAL:
+                    ParserCombinator._stores = 0
+                    ParserCombinator._sweep_cache()
+            return new_pos
+        finally:
+            ParserCombinator._depth -= 1
+            if ParserCombinator._depth == 0:
+                cache.clear()
+                ParserCombinator._high_pos = 0
+
+    # evicts entries for positions well behind the furthest offset reached, keeping
+    # cache memory proportional to the window instead of the whole input
+    @staticmethod
+    def _sweep_cache() -> None:
+        horizon = ParserCombinator._high_pos - ParserCombinator._CACHE_WINDOW
+        if horizon <= 0:
+            return
+        cache = ParserCombinator._cache
+        for key in [key for key in cache if key[1] < horizon]:
+            del cache[key]
+
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
         pass
 
+    # the set of characters a successful, input-consuming match can begin with, or
+    # None when it cannot be determined. May be a superset of the true set; AltParser
+    # only uses it to rule alternatives out, so a superset is always safe.
+    def first_set(self) -> Optional[frozenset]:
+        return None
+
+    # whether this parser can succeed without consuming any input. True is the safe
+    # conservative answer.
+    def matches_empty(self) -> bool:
+        return True
+
     # when adding two parsers together it's like parsing one after another
     def __add__(self, other: "ParserCombinator") -> "ParserCombinator":
-        origin = self
-
-        class Result(ParserCombinator):
-            def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-                first = origin.parse(input_str)
-                if first is not None:
-                    first_token, rest = first
-                    second = other.parse(rest)
-                    if second is None:
-                        return None
-                    else:
-                        second_token, second_rest = second
-                        return first_token + second_token, second_rest
-                else:
-                    return None
-
-        return Result()
+        return SeqParser(self, other)
 
     # when multiplying two parsers it's parsing with the first parser then if that fails parse with
     # with the second parser only one parser is executed.
     def __mul__(self, other: "ParserCombinator") -> "ParserCombinator":
-        origin = self
-
-        class Result(ParserCombinator):
-            def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-                first = origin.parse(input_str)
-                if first is not None:
-                    return first
-                else:
-                    return other.parse(input_str)
-
-        return Result()
+        return AltParser(self, other)
 
     def __or__(self, other: "ParserCombinator") -> "ParserCombinator":
         return self * other
@@ -53,90 +137,474 @@ class ParserCombinator(ABC):
     # ex: a & b & c & d. If any parser has an error will return a None.
     # If all parsers work will return result of right most parser.
     def __and__(self, other: "ParserCombinator") -> "ParserCombinator":
-        origin = self
+        return AndParser(self, other)
 
-        class Result(ParserCombinator):
-            def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-                first = origin.parse(input_str)
-                if first is None:
-                    return None
-                else:
-                    return other.parse(input_str)
 
-        return Result()
+# splices directly nested parsers of the same class into one flat tuple, so chains
+# built by repeated binary operators (a + b + c + ...) become a single n-ary node
+# iterated in one loop rather than a tree walked one Python call per level.
+def _flatten(
+    cls: type, a: ParserCombinator, b: ParserCombinator
+) -> Tuple[ParserCombinator, ...]:
+    parsers: List[ParserCombinator] = []
+    for parser in (a, b):
+        if type(parser) is cls:
+            parsers.extend(parser.parsers)
+        else:
+            parsers.append(parser)
+    return tuple(parsers)
+
+
+# parses each child in order, concatenating their tokens; fails if any child fails.
+# this is what + builds. A concrete named class instead of an anonymous subclass per
+# composition: one shared class means no closure cell dereferences and lets CPython's
+# attribute caches specialize on a single type for the whole grammar.
+class SeqParser(ParserCombinator):
+    __slots__ = ("parsers", "parse_ats")
+
+    def __init__(self, a: ParserCombinator, b: ParserCombinator):
+        self.parsers = _flatten(SeqParser, a, b)
+        # the bound methods are looked up once here instead of once per parse call
+        self.parse_ats = tuple(parser.parse_at for parser in self.parsers)
+
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        for parse_at in self.parse_ats:
+            pos = parse_at(source, pos, out, discard)
+            if pos is None:
+                return None
+        return pos
+
+    # a sequence can begin with whatever its leading children can begin with, up to
+    # and including the first child that always consumes input
+    def first_set(self) -> Optional[frozenset]:
+        chars: set = set()
+        for parser in self.parsers:
+            parser_chars = parser.first_set()
+            if parser_chars is None:
+                return None
+            chars |= parser_chars
+            if not parser.matches_empty():
+                return frozenset(chars)
+        return frozenset(chars)
+
+    def matches_empty(self) -> bool:
+        return all(parser.matches_empty() for parser in self.parsers)
+
+
+# tries each child in order at the same position and returns the first success.
+# this is what * (and |) builds.
+# before parsing, the alternatives are split by the character a match can start with:
+# a dict maps the next input character to just the alternatives that can begin with
+# it (plus any that might match empty or whose first characters are unknown, which
+# must always be tried), preserving the original ordering. One dict lookup then
+# replaces up to N doomed parse attempts. Built lazily on first parse because
+# recursive grammars are not fully defined while the alternatives are being composed.
+class AltParser(ParserCombinator):
+    __slots__ = ("parsers", "dispatch", "fallback")
+
+    def __init__(self, a: ParserCombinator, b: ParserCombinator):
+        self.parsers = _flatten(AltParser, a, b)
+        self.dispatch: Optional[Dict[str, Tuple[Callable, ...]]] = None
+        self.fallback: Tuple[Callable, ...] = ()
+
+    def _build_dispatch(self) -> Dict[str, Tuple[Callable, ...]]:
+        first_sets = {}
+        always_try = set()
+        for parser in self.parsers:
+            chars = parser.first_set()
+            if chars is None or parser.matches_empty():
+                always_try.add(id(parser))
+            first_sets[id(parser)] = chars or frozenset()
+        # the candidate tuples hold bound parse_at methods so the hot loop calls
+        # them without an attribute lookup
+        dispatch = {}
+        for char in frozenset().union(*first_sets.values()):
+            dispatch[char] = tuple(
+                parser.parse_at
+                for parser in self.parsers
+                if id(parser) in always_try or char in first_sets[id(parser)]
+            )
+        self.fallback = tuple(
+            parser.parse_at for parser in self.parsers if id(parser) in always_try
+        )
+        self.dispatch = dispatch
+        return dispatch
+
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        dispatch = self.dispatch
+        if dispatch is None:
+            dispatch = self._build_dispatch()
+        if pos < len(source):
+            candidates = dispatch.get(source[pos], self.fallback)
+        else:
+            candidates = self.fallback
+        for parse_at in candidates:
+            new_pos = parse_at(source, pos, out, discard)
+            if new_pos is not None:
+                return new_pos
+        return None
+
+    def first_set(self) -> Optional[frozenset]:
+        chars: set = set()
+        for parser in self.parsers:
+            parser_chars = parser.first_set()
+            if parser_chars is None:
+                return None
+            chars |= parser_chars
+        return frozenset(chars)
+
+    def matches_empty(self) -> bool:
+        return any(parser.matches_empty() for parser in self.parsers)
+
+
+# requires every child to match at the same position and returns the result of the
+# right most one. this is what & builds.
+class AndParser(ParserCombinator):
+    __slots__ = ("parsers", "parse_ats")
+
+    def __init__(self, a: ParserCombinator, b: ParserCombinator):
+        self.parsers = _flatten(AndParser, a, b)
+        self.parse_ats = tuple(parser.parse_at for parser in self.parsers)
+
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        # only the right most child's tokens survive, so the predicates run discarded
+        for parse_at in self.parse_ats[:-1]:
+            if parse_at(source, pos, out, True) is None:
+                return None
+        return self.parse_ats[-1](source, pos, out, discard)
+
+    # the result (and therefore the consumption) comes from the right most child, so
+    # its first set is a safe superset of this parser's
+    def first_set(self) -> Optional[frozenset]:
+        return self.parsers[-1].first_set()
+
+    def matches_empty(self) -> bool:
+        return self.parsers[-1].matches_empty()
 
 
 # attempts to parse a single letter
 
 
 class LetterParser(ParserCombinator):
+    __slots__ = ("letter",)
+
     def __init__(self, letter: str):
         if len(letter) > 1:
             raise Exception("letter must be one character or less(identity)")
         self.letter = letter
 
-    def parse(self, input_str: str) -> Optional[Tuple[List[str], str]]:
-        if len(input_str) == 0:
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        if pos < len(source) and source[pos] == self.letter:
+            if not discard:
+                out.append(self.letter)
+            return pos + 1
+        else:
+            return None
+
+    def first_set(self) -> frozenset:
+        return frozenset(self.letter)
+
+    def matches_empty(self) -> bool:
+        return False
+
+
+# attempts to parse a fixed word, returning the whole word as one token.
+# equivalent to LetterParser('w') + LetterParser('o') + ... but matches with a single
+# startswith call instead of one Python call and one list concatenation per letter.
+class StringParser(ParserCombinator):
+    __slots__ = ("word", "length")
+
+    def __init__(self, word: str):
+        self.word = word
+        self.length = len(word)
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        if source.startswith(self.word, pos):
+            if not discard:
+                out.append(self.word)
+            return pos + self.length
+        else:
             return None
-        if input_str[0] == self.letter:
-            return [self.letter], input_str[1:]
+
+    def first_set(self) -> frozenset:
+        return frozenset(self.word[:1])
+
+    def matches_empty(self) -> bool:
+        return self.length == 0
+
+
+# attempts to parse any one of a fixed set of words, longest words first so that a
+# word that is a prefix of another ("no" vs "not") can never shadow the longer match.
+# equivalent to StringParser(w1) * StringParser(w2) * ... but one parser call doing a
+# few startswith checks, each of which compares the whole word in one C level call,
+# instead of a nested alternative tree.
+class AnyOfStringsParser(ParserCombinator):
+    __slots__ = ("words",)
+
+    def __init__(self, words: List[str]):
+        self.words = tuple(sorted(words, key=len, reverse=True))
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        for word in self.words:
+            if source.startswith(word, pos):
+                if not discard:
+                    out.append(word)
+                return pos + len(word)
+        return None
+
+    def first_set(self) -> frozenset:
+        return frozenset(word[0] for word in self.words if word)
+
+    def matches_empty(self) -> bool:
+        return any(word == "" for word in self.words)
+
+
+# attempts to parse a single letter out of a set of allowed letters.
+# equivalent to reduce(|, [LetterParser(c) for c in chars]) but matches with one
+# frozenset membership test instead of up to len(chars) failed LetterParser attempts.
+class CharsetParser(ParserCombinator):
+    __slots__ = ("chars",)
+
+    def __init__(self, chars: str):
+        self.chars = frozenset(chars)
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        if pos < len(source) and source[pos] in self.chars:
+            if not discard:
+                out.append(source[pos])
+            return pos + 1
         else:
             return None
 
+    def first_set(self) -> frozenset:
+        return frozenset(self.chars)
+
+    def matches_empty(self) -> bool:
+        return False
+
+
+# matches a precompiled regular expression at the current position and returns the
+# matched text as one token; an empty match counts as failure so repetition around a
+# RegexParser cannot loop forever. Character runs (digit strings, string bodies) scan
+# inside CPython's C regex engine instead of one Python-level parser call per character.
+class RegexParser(ParserCombinator):
+    __slots__ = ("regex",)
+
+    def __init__(self, pattern: str):
+        self.regex = re.compile(pattern)
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        match = self.regex.match(source, pos)
+        if match is None or match.end() == pos:
+            return None
+        if not discard:
+            out.append(match.group(0))
+        return match.end()
+
+    def matches_empty(self) -> bool:
+        return False
+
+
+_spaces_regex = re.compile(" *")
+
+
+# skips over any run of spaces (including none) and always succeeds with no tokens.
+# equivalent to OptionalParser(IgnoreParser(RepeatParser(LetterParser(' ')))) but a
+# single tight loop with zero allocations, instead of building a token list per space
+# just to throw it away. space parsing happens around every token so this is the most
+# called parser in the json and expression grammars.
+class SkipSpaces(ParserCombinator):
+    __slots__ = ()
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> int:
+        return _spaces_regex.match(source, pos).end()
+
+    def first_set(self) -> frozenset:
+        return frozenset(" ")
+
 
 # Takes in a parser on construction and returns a new parser that repeatedly applies the parser
 # until an error occurs. Then returns the tokens and consumed string before the error occured.
 # If First attempt at parsing returns an error then the parser will return None
 class RepeatParser(ParserCombinator):
+    __slots__ = ("parser", "parser_parse_at")
+
     def __init__(self, other_parser: ParserCombinator):
         self.parser = other_parser
+        self.parser_parse_at = other_parser.parse_at
 
-    def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-        result = self.parser.parse(input_str)
-        if result is None:
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        # iterate instead of recursing: no Python frame per matched element and no
+        # recursion limit on long inputs. Children append straight into out and a
+        # failing attempt rolls itself back, so there is nothing to clean up here.
+        parse_at = self.parser_parse_at
+        new_pos = parse_at(source, pos, out, discard)
+        if new_pos is None:
             return None
-        else:
-            tokens, rest = result
-            next_result = self.parse(rest)
-            if next_result is None:
-                return tokens, rest
-            else:
-                next_tokens, next_rests = next_result
-                return tokens + next_tokens, next_rests
+        while new_pos is not None:
+            pos = new_pos
+            new_pos = parse_at(source, pos, out, discard)
+        return pos
+
+    def first_set(self) -> Optional[frozenset]:
+        return self.parser.first_set()
+
+    def matches_empty(self) -> bool:
+        return self.parser.matches_empty()
+
+
+# parses one element, then repeatedly a separator followed by another element, like
+# the comma separated lists in json arrays and objects. A trailing separator with no
+# element after it is left unconsumed. This is the left factored replacement for
+# (RepeatParser(element + separator) + element) * element, which re-parsed elements
+# from scratch whenever the repeating arm failed and the bare arm was retried; here
+# every element is parsed exactly once.
+class SepByParser(ParserCombinator):
+    __slots__ = ("element", "separator", "element_parse_at", "separator_parse_at")
+
+    def __init__(self, element: ParserCombinator, separator: ParserCombinator):
+        self.element = element
+        self.separator = separator
+        self.element_parse_at = element.parse_at
+        self.separator_parse_at = separator.parse_at
+
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        element_parse_at = self.element_parse_at
+        separator_parse_at = self.separator_parse_at
+        new_pos = element_parse_at(source, pos, out, discard)
+        if new_pos is None:
+            return None
+        while True:
+            pos = new_pos
+            mark = len(out)
+            sep_pos = separator_parse_at(source, pos, out, discard)
+            if sep_pos is None:
+                return pos
+            new_pos = element_parse_at(source, sep_pos, out, discard)
+            if new_pos is None:
+                # separator matched but no element follows: give the separator back
+                del out[mark:]
+                return pos
+
+    def first_set(self) -> Optional[frozenset]:
+        return self.element.first_set()
+
+    def matches_empty(self) -> bool:
+        return self.element.matches_empty()
 
 
 # Eliminates token from the return result, it only returns the rest of consumed string and an empty token list
 # turns a regular parser into a parser such that no token is returned but the string is consumed.
 class IgnoreParser(ParserCombinator):
+    __slots__ = ("parser", "parser_parse_at")
+
     def __init__(self, other_parser: ParserCombinator):
         self.parser = other_parser
+        self.parser_parse_at = other_parser.parse_at
 
-    def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-        result = self.parser.parse(input_str)
-        if result is None:
-            return None
-        else:
-            tokens, rest = result
-            return [], rest
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        # the whole point of this parser is that nobody looks at the inner tokens,
+        # so the subtree runs in discard mode and never allocates them
+        return self.parser_parse_at(source, pos, out, True)
+
+    def first_set(self) -> Optional[frozenset]:
+        return self.parser.first_set()
+
+    def matches_empty(self) -> bool:
+        return self.parser.matches_empty()
 
 
 # takes the results of another parser and attempts to convert the tokens returned into another token.
 # you supply into a constructor a function that takes a list of tokens and converts those tokens into a new token.
 class ConvertToType(ParserCombinator):
+    __slots__ = ("parser", "converter", "parser_parse_at")
+
     def __init__(
         self, other_parser: ParserCombinator, conversion: Callable[[List[Any]], Any]
     ):
         self.converter = conversion
         self.parser = other_parser
+        self.parser_parse_at = other_parser.parse_at
 
-    def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-        result = self.parser.parse(input_str)
-        if result is None:
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        # conversion needs the real tokens, so the inner parser always runs with
+        # discard off; the converter still runs in discard mode since it may reject
+        # the tokens, its result just is not kept
+        mark = len(out)
+        new_pos = self.parser_parse_at(source, pos, out, False)
+        if new_pos is None:
             return None
-        else:
-            tokens, rest = result
-            tokens = [self.converter(tokens)]
-            return tokens, rest
+        try:
+            out[mark:] = [self.converter(out[mark:])]
+        except ValueError:
+            # a converter rejecting its tokens is an ordinary parse failure: the
+            # caller rolls the raw tokens back and alternatives keep backtracking
+            return None
+        if discard:
+            del out[mark:]
+        return new_pos
+
+    def first_set(self) -> Optional[frozenset]:
+        return self.parser.first_set()
+
+    def matches_empty(self) -> bool:
+        return self.parser.matches_empty()
+
+
+# runs another parser purely for how far it consumes and replaces whatever tokens it
+# produced with a single token: the consumed slice of the source. Composed number and
+# string grammars otherwise accumulate one single-character token per input character
+# and join them back together in a converter; recording just the (start, end) span
+# makes that one substring allocation instead of N appends plus a join.
+class SpanParser(ParserCombinator):
+    __slots__ = ("parser", "parser_parse_at")
+
+    def __init__(self, other_parser: ParserCombinator):
+        self.parser = other_parser
+        self.parser_parse_at = other_parser.parse_at
+
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        # only the reach of the inner parser matters, so it always runs discarded
+        new_pos = self.parser_parse_at(source, pos, out, True)
+        if new_pos is None:
+            return None
+        if not discard:
+            out.append(source[pos:new_pos])
+        return new_pos
+
+    def first_set(self) -> Optional[frozenset]:
+        return self.parser.first_set()
+
+    def matches_empty(self) -> bool:
+        return self.parser.matches_empty()
 
 
 # optional parser will take a parser and transform it into a parser that does what the original parser does
@@ -146,15 +614,26 @@ class ConvertToType(ParserCombinator):
 # letter parser results in an error because it can't parse B into A so you get None
 # but optional parser turns that error into ([], "B")
 class OptionalParser(ParserCombinator):
+    __slots__ = ("parser", "parser_parse_at")
+
     def __init__(self, other_parser: ParserCombinator):
         self.parser = other_parser
+        self.parser_parse_at = other_parser.parse_at
 
-    def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-        result = self.parser.parse(input_str)
-        if result is None:
-            return [], input_str
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        new_pos = self.parser_parse_at(source, pos, out, discard)
+        if new_pos is None:
+            return pos
         else:
-            return result
+            return new_pos
+
+    def first_set(self) -> Optional[frozenset]:
+        return self.parser.first_set()
+
+
+_first_set_guard: set = set()
 
 
 # LazyParser creates a parser that defers parser creation to parse time,
@@ -174,27 +653,880 @@ class OptionalParser(ParserCombinator):
 # parserC = parserM + parserA
 #
 class LazyParser(ParserCombinator):
+    __slots__ = ("parser_creator", "resolved", "resolved_parse_at")
+
     def __init__(self, other_parser_function: Callable[[], ParserCombinator]):
         self.parser_creator = other_parser_function
+        self.resolved: Optional[ParserCombinator] = None
+        self.resolved_parse_at: Optional[Callable] = None
 
-    def parse(self, input_str: str):
-        parser = self.parser_creator()
-        return parser.parse(input_str)
+    # the creator function only exists to defer name lookup until the recursive
+    # definitions are complete, so its result never changes: build the inner parser
+    # once on first use instead of rebuilding the whole subtree on every invocation.
+    def resolve(self) -> ParserCombinator:
+        if self.resolved is None:
+            self.resolved = self.parser_creator()
+            self.resolved_parse_at = self.resolved.parse_at
+        return self.resolved
+
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        parse_at = self.resolved_parse_at
+        if parse_at is None:
+            self.resolve()
+            parse_at = self.resolved_parse_at
+        return parse_at(source, pos, out, discard)
+
+    # first_set has to look through the deferred definition, which in a recursive
+    # grammar can lead straight back here; answer "unknown" for the recursive case
+    # instead of recursing forever
+    def first_set(self) -> Optional[frozenset]:
+        if id(self) in _first_set_guard:
+            return None
+        _first_set_guard.add(id(self))
+        try:
+            return self.resolve().first_set()
+        finally:
+            _first_set_guard.discard(id(self))
+
+    def matches_empty(self) -> bool:
+        if id(self) in _first_set_guard:
+            return True
+        _first_set_guard.add(id(self))
+        try:
+            return self.resolve().matches_empty()
+        finally:
+            _first_set_guard.discard(id(self))
 
 
 # This parser transfroms other parsers such that if the original parser parses successfully
 # it now returns an error. What was previously an error now returns empty tokens with the input string unconsumed
 # Ex: NotParser(ParseA).parse("A") returns None
 class NotParser(ParserCombinator):
+    __slots__ = ("parser", "parser_parse_at")
+
     def __init__(self, other_parser: ParserCombinator):
         self.parser = other_parser
+        self.parser_parse_at = other_parser.parse_at
 
-    def parse(self, input_str: str) -> Optional[Tuple[List[Any], str]]:
-        result = self.parser.parse(input_str)
+    def _parse(
+        self, source: str, pos: int, out: List[Any], discard: bool
+    ) -> Optional[int]:
+        # pure lookahead: the inner tokens are never wanted
+        if self.parser_parse_at(source, pos, out, True) is None:
+            return pos
+        return None
+
+    def first_set(self) -> frozenset:
+        return frozenset()
+
+
+# compile_parser walks a fully built combinator tree and generates one flat Python
+# function per grammar entry point instead of interpreting the tree at parse time.
+# Every combinator layer normally costs one Python call per input character; the
+# generated source inlines the letter/charset/word/space/sequence/alternative logic
+# into straight line code reading the shared locals (source, pos, out, ok), so a parse
+# runs a handful of functions (one per LazyParser, which is where recursion lives)
+# instead of hundreds of tiny parse_at frames. Converters and charsets are passed into
+# the generated module through its namespace. The compiled function trades the packrat
+# cache for straight line code, which is the right trade once the exponential
+# alternatives have been flattened out of the grammar.
+class _CodegenContext:
+    def __init__(self):
+        self.counter = 0
+        self.functions: List[str] = []
+        self.namespace: Dict[str, Any] = {}
+        self.lazy_names: Dict[int, str] = {}
+        self.lazy_nodes: List[ParserCombinator] = []  # keep ids stable while compiling
+
+    def next_id(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+def _indent(lines: List[str], levels: int) -> List[str]:
+    return ["    " * levels + line for line in lines]
+
+
+# emits the lines implementing one node. The emitted code assumes ok is True on entry
+# and the locals source, pos, out, ok, length are in scope; on failure it sets ok to
+# False, leaving pos/out rollback to the enclosing alternative/optional/repeat.
+def _emit(node: ParserCombinator, ctx: _CodegenContext) -> List[str]:
+    if isinstance(node, SeqParser):
+        # children emitted at one shared level, each guarded by the ok flag, so a
+        # flattened n-element sequence only deepens the generated code by one level
+        lines = _emit(node.parsers[0], ctx)
+        for child in node.parsers[1:]:
+            lines += ["if ok:"] + _indent(_emit(child, ctx), 1)
+        return lines
+    if isinstance(node, AltParser):
+        n = ctx.next_id()
+        lines = [f"save_{n} = pos", f"mark_{n} = len(out)"]
+        lines += _emit(node.parsers[0], ctx)
+        for child in node.parsers[1:]:
+            lines += ["if not ok:"] + _indent(
+                ["ok = True", f"pos = save_{n}", f"del out[mark_{n}:]"]
+                + _emit(child, ctx),
+                1,
+            )
+        return lines
+    if isinstance(node, AndParser):
+        n = ctx.next_id()
+        lines = [f"save_{n} = pos", f"mark_{n} = len(out)"]
+        lines += _emit(node.parsers[0], ctx)
+        for child in node.parsers[1:]:
+            lines += ["if ok:"] + _indent(
+                [f"pos = save_{n}", f"del out[mark_{n}:]"] + _emit(child, ctx), 1
+            )
+        return lines
+    if isinstance(node, LetterParser):
+        return [
+            f"if pos < length and source[pos] == {node.letter!r}:",
+            f"    out.append({node.letter!r})",
+            "    pos += 1",
+            "else:",
+            "    ok = False",
+        ]
+    if isinstance(node, CharsetParser):
+        name = f"charset_{ctx.next_id()}"
+        ctx.namespace[name] = node.chars
+        return [
+            f"if pos < length and source[pos] in {name}:",
+            "    out.append(source[pos])",
+            "    pos += 1",
+            "else:",
+            "    ok = False",
+        ]
+    if isinstance(node, StringParser):
+        return [
+            f"if source.startswith({node.word!r}, pos):",
+            f"    out.append({node.word!r})",
+            f"    pos += {node.length}",
+            "else:",
+            "    ok = False",
+        ]
+    if isinstance(node, AnyOfStringsParser):
+        n = ctx.next_id()
+        name = f"words_{n}"
+        ctx.namespace[name] = node.words
+        return [
+            f"matched_{n} = None",
+            f"for word_{n} in {name}:",
+            f"    if source.startswith(word_{n}, pos):",
+            f"        matched_{n} = word_{n}",
+            "        break",
+            f"if matched_{n} is None:",
+            "    ok = False",
+            "else:",
+            f"    out.append(matched_{n})",
+            f"    pos += len(matched_{n})",
+        ]
+    if isinstance(node, SkipSpaces):
+        ctx.namespace["spaces_regex"] = _spaces_regex
+        return ["pos = spaces_regex.match(source, pos).end()"]
+    if isinstance(node, RegexParser):
+        n = ctx.next_id()
+        name = f"regex_{n}"
+        ctx.namespace[name] = node.regex
+        return [
+            f"match_{n} = {name}.match(source, pos)",
+            f"if match_{n} is None or match_{n}.end() == pos:",
+            "    ok = False",
+            "else:",
+            f"    out.append(match_{n}.group(0))",
+            f"    pos = match_{n}.end()",
+        ]
+    if isinstance(node, RepeatParser):
+        n = ctx.next_id()
+        body = _emit(node.parser, ctx)
+        return (
+            body
+            + ["if ok:"]
+            + _indent(
+                ["while True:"]
+                + _indent(
+                    [f"save_{n} = pos", f"mark_{n} = len(out)"]
+                    + body
+                    + [
+                        "if not ok:",
+                        "    ok = True",
+                        f"    pos = save_{n}",
+                        f"    del out[mark_{n}:]",
+                        "    break",
+                    ],
+                    1,
+                ),
+                1,
+            )
+        )
+    if isinstance(node, SepByParser):
+        n = ctx.next_id()
+        element = _emit(node.element, ctx)
+        return (
+            element
+            + ["if ok:"]
+            + _indent(
+                ["while True:"]
+                + _indent(
+                    [f"save_{n} = pos", f"mark_{n} = len(out)"]
+                    + _emit(node.separator, ctx)
+                    + ["if ok:"]
+                    + _indent(element, 1)
+                    + [
+                        "if not ok:",
+                        "    ok = True",
+                        f"    pos = save_{n}",
+                        f"    del out[mark_{n}:]",
+                        "    break",
+                    ],
+                    1,
+                ),
+                1,
+            )
+        )
+    if isinstance(node, OptionalParser):
+        n = ctx.next_id()
+        return (
+            [f"save_{n} = pos", f"mark_{n} = len(out)"]
+            + _emit(node.parser, ctx)
+            + [
+                "if not ok:",
+                "    ok = True",
+                f"    pos = save_{n}",
+                f"    del out[mark_{n}:]",
+            ]
+        )
+    if isinstance(node, IgnoreParser):
+        n = ctx.next_id()
+        return (
+            [f"mark_{n} = len(out)"]
+            + _emit(node.parser, ctx)
+            + ["if ok:", f"    del out[mark_{n}:]"]
+        )
+    if isinstance(node, NotParser):
+        n = ctx.next_id()
+        return (
+            [f"save_{n} = pos", f"mark_{n} = len(out)"]
+            + _emit(node.parser, ctx)
+            + [
+                f"del out[mark_{n}:]",
+                "if ok:",
+                "    ok = False",
+                "else:",
+                "    ok = True",
+                f"    pos = save_{n}",
+            ]
+        )
+    if isinstance(node, SpanParser):
+        n = ctx.next_id()
+        return (
+            [f"start_{n} = pos", f"mark_{n} = len(out)"]
+            + _emit(node.parser, ctx)
+            + [
+                "if ok:",
+                f"    del out[mark_{n}:]",
+                f"    out.append(source[start_{n}:pos])",
+            ]
+        )
+    if isinstance(node, ConvertToType):
+        n = ctx.next_id()
+        name = f"convert_{n}"
+        ctx.namespace[name] = node.converter
+        return (
+            [f"mark_{n} = len(out)"]
+            + _emit(node.parser, ctx)
+            + [
+                "if ok:",
+                "    try:",
+                f"        out[mark_{n}:] = [{name}(out[mark_{n}:])]",
+                "    except ValueError:",
+                "        ok = False",
+            ]
+        )
+    if isinstance(node, LazyParser):
+        function_name = _emit_function(node, ctx)
+        n = ctx.next_id()
+        return [
+            f"result_{n} = {function_name}(source, pos)",
+            f"if result_{n} is None:",
+            "    ok = False",
+            "else:",
+            f"    tokens_{n}, pos = result_{n}",
+            f"    out.extend(tokens_{n})",
+        ]
+    raise Exception(f"cannot generate code for parser {node!r}")
+
+
+# every LazyParser becomes its own generated function so recursive grammars
+# (json_parser, expression_parser) compile into mutually recursive functions.
+def _emit_function(node: ParserCombinator, ctx: _CodegenContext) -> str:
+    if id(node) in ctx.lazy_names:
+        return ctx.lazy_names[id(node)]
+    function_name = f"parse_fn_{ctx.next_id()}"
+    ctx.lazy_names[id(node)] = function_name
+    ctx.lazy_nodes.append(node)
+    target = node.resolve() if isinstance(node, LazyParser) else node
+    body = _emit(target, ctx)
+    lines = (
+        [f"def {function_name}(source, pos):", "    length = len(source)"]
+        + ["    out = []", "    ok = True"]
+        + _indent(body, 1)
+        + ["    if ok:", "        return out, pos", "    return None"]
+    )
+    ctx.functions.append("\n".join(lines))
+    return function_name
+
+
+# a compiled parser is still a ParserCombinator so it composes and parses like any
+# other; parse_at just jumps straight into the generated root function.
+class CompiledParser(ParserCombinator):
+    __slots__ = ("parse_function", "source_code")
+
+    def __init__(self, parse_function: Callable, source_code: str):
+        self.parse_function = parse_function
+        self.source_code = source_code
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        result = self.parse_function(source, pos)
+        if result is None:
+            return None
+        tokens, new_pos = result
+        if not discard:
+            out.extend(tokens)
+        return new_pos
+
+
+def compile_parser(parser: ParserCombinator) -> CompiledParser:
+    ctx = _CodegenContext()
+    root_name = _emit_function(parser, ctx)
+    source_code = "\n\n".join(ctx.functions)
+    exec(compile(source_code, "<generated parser>", "exec"), ctx.namespace)
+    return CompiledParser(ctx.namespace[root_name], source_code)
+
+
+# compile_program flattens a combinator tree into a parsing machine program: a flat
+# list of opcode tuples executed by one while loop in run_program. Where the tree
+# interpreter pays a Python method call per node per attempt and compile_parser pays a
+# function frame per LazyParser, the machine pays one dict-free dispatch per opcode and
+# keeps all of its state in five locals (pc, pos, out, marks, calls) plus one explicit
+# backtrack stack, so backtracking is a stack pop instead of unwinding Python frames.
+# grammar constants (charsets, words, compiled regexes, converters) ride along as
+# operands inside the instruction tuples.
+
+# character matchers; each appends its token and advances, or fails
+OP_CHAR = 0  # (OP_CHAR, letter)
+OP_CHARSET = 1  # (OP_CHARSET, frozenset_of_chars)
+OP_STRING = 2  # (OP_STRING, word, length)
+OP_ANY_OF = 3  # (OP_ANY_OF, words_longest_first)
+OP_REGEX = 4  # (OP_REGEX, compiled_regex)
+OP_SPACES = 5  # (OP_SPACES,)
+# control flow; targets are absolute program addresses
+OP_CHOICE = 6  # (OP_CHOICE, target) push a backtrack entry resuming at target
+OP_COMMIT = 7  # (OP_COMMIT, target) drop the entry and jump: the alternative stuck
+OP_PARTIAL_COMMIT = 8  # (OP_PARTIAL_COMMIT, target) re-arm the entry here and jump
+OP_BACK_COMMIT = 9  # (OP_BACK_COMMIT, target) rewind to the entry but jump: lookahead
+OP_FAIL = 10  # (OP_FAIL,)
+OP_FAIL_TWICE = 11  # (OP_FAIL_TWICE,) drop the entry, then fail: negative lookahead
+OP_CALL = 12  # (OP_CALL, target) subroutine call, one per LazyParser
+OP_RETURN = 13  # (OP_RETURN,)
+# token bookkeeping; marks remember (pos, len(out)) across a subtree
+OP_MARK = 14  # (OP_MARK,)
+OP_DROP = 15  # (OP_DROP,) delete the subtree's tokens (IgnoreParser)
+OP_SPAN = 16  # (OP_SPAN,) replace them with the matched slice (SpanParser)
+OP_CONVERT = 17  # (OP_CONVERT, converter) fold them through a converter
+OP_END = 18  # (OP_END,) whole parse succeeded
+
+
+# a jump target that doesn't have an address yet; placed in the code stream as a
+# position marker and as a branch operand, resolved to integers in one final pass
+class _Label:
+    __slots__ = ()
+
+
+class _ProgramContext:
+    def __init__(self):
+        self.code: List[Any] = []  # instruction tuples interleaved with _Label markers
+        self.lazy_labels: Dict[int, _Label] = {}
+        self.pending: List[Tuple[_Label, ParserCombinator]] = []
+        self.lazy_nodes: List[ParserCombinator] = []  # keep ids stable while compiling
+
+
+def _emit_ops(node: ParserCombinator, ctx: _ProgramContext) -> None:
+    code = ctx.code
+    if isinstance(node, SeqParser):
+        for child in node.parsers:
+            _emit_ops(child, ctx)
+        return
+    if isinstance(node, AltParser):
+        # ordered choice: each arm but the last runs under a choice point and commits
+        # past its siblings on success
+        done = _Label()
+        for child in node.parsers[:-1]:
+            next_arm = _Label()
+            code.append((OP_CHOICE, next_arm))
+            _emit_ops(child, ctx)
+            code.append((OP_COMMIT, done))
+            code.append(next_arm)
+        _emit_ops(node.parsers[-1], ctx)
+        code.append(done)
+        return
+    if isinstance(node, AndParser):
+        # each predicate is an and-lookahead: rewind position and tokens on success,
+        # fail the whole node on failure
+        for predicate in node.parsers[:-1]:
+            on_fail = _Label()
+            matched = _Label()
+            code.append((OP_CHOICE, on_fail))
+            _emit_ops(predicate, ctx)
+            code.append((OP_BACK_COMMIT, matched))
+            code.append(on_fail)
+            code.append((OP_FAIL,))
+            code.append(matched)
+        _emit_ops(node.parsers[-1], ctx)
+        return
+    if isinstance(node, LetterParser):
+        code.append((OP_CHAR, node.letter))
+        return
+    if isinstance(node, CharsetParser):
+        code.append((OP_CHARSET, node.chars))
+        return
+    if isinstance(node, StringParser):
+        code.append((OP_STRING, node.word, node.length))
+        return
+    if isinstance(node, AnyOfStringsParser):
+        code.append((OP_ANY_OF, node.words))
+        return
+    if isinstance(node, RegexParser):
+        code.append((OP_REGEX, node.regex))
+        return
+    if isinstance(node, SkipSpaces):
+        code.append((OP_SPACES,))
+        return
+    if isinstance(node, RepeatParser):
+        # one mandatory iteration, then a star loop that re-arms its own choice point
+        # with a partial commit instead of popping and pushing every time around
+        _emit_ops(node.parser, ctx)
+        done = _Label()
+        body = _Label()
+        code.append((OP_CHOICE, done))
+        code.append(body)
+        _emit_ops(node.parser, ctx)
+        code.append((OP_PARTIAL_COMMIT, body))
+        code.append(done)
+        return
+    if isinstance(node, SepByParser):
+        # a failure anywhere in separator + element rewinds to the end of the last
+        # complete element, so a trailing separator is left unconsumed
+        _emit_ops(node.element, ctx)
+        done = _Label()
+        body = _Label()
+        code.append((OP_CHOICE, done))
+        code.append(body)
+        _emit_ops(node.separator, ctx)
+        _emit_ops(node.element, ctx)
+        code.append((OP_PARTIAL_COMMIT, body))
+        code.append(done)
+        return
+    if isinstance(node, OptionalParser):
+        done = _Label()
+        code.append((OP_CHOICE, done))
+        _emit_ops(node.parser, ctx)
+        code.append((OP_COMMIT, done))
+        code.append(done)
+        return
+    if isinstance(node, IgnoreParser):
+        code.append((OP_MARK,))
+        _emit_ops(node.parser, ctx)
+        code.append((OP_DROP,))
+        return
+    if isinstance(node, NotParser):
+        matched = _Label()
+        code.append((OP_CHOICE, matched))
+        _emit_ops(node.parser, ctx)
+        code.append((OP_FAIL_TWICE,))
+        code.append(matched)
+        return
+    if isinstance(node, SpanParser):
+        code.append((OP_MARK,))
+        _emit_ops(node.parser, ctx)
+        code.append((OP_SPAN,))
+        return
+    if isinstance(node, ConvertToType):
+        code.append((OP_MARK,))
+        _emit_ops(node.parser, ctx)
+        code.append((OP_CONVERT, node.converter))
+        return
+    if isinstance(node, LazyParser):
+        # every LazyParser becomes its own subroutine so recursive grammars compile
+        # into calls instead of infinite inlining
+        if id(node) not in ctx.lazy_labels:
+            label = _Label()
+            ctx.lazy_labels[id(node)] = label
+            ctx.lazy_nodes.append(node)
+            ctx.pending.append((label, node.resolve()))
+        code.append((OP_CALL, ctx.lazy_labels[id(node)]))
+        return
+    raise Exception(f"cannot compile parser {node!r} into a program")
+
+
+def compile_program(parser: ParserCombinator) -> List[Tuple]:
+    ctx = _ProgramContext()
+    root = _Label()
+    ctx.code.append((OP_CALL, root))
+    ctx.code.append((OP_END,))
+    ctx.pending.append((root, parser))
+    while ctx.pending:
+        label, node = ctx.pending.pop(0)
+        ctx.code.append(label)
+        _emit_ops(node, ctx)
+        ctx.code.append((OP_RETURN,))
+    # resolve labels: markers pin addresses, then branch operands become plain ints
+    addresses: Dict[_Label, int] = {}
+    address = 0
+    for entry in ctx.code:
+        if isinstance(entry, _Label):
+            addresses[entry] = address
+        else:
+            address += 1
+    program = []
+    for entry in ctx.code:
+        if isinstance(entry, _Label):
+            continue
+        if len(entry) > 1 and isinstance(entry[1], _Label):
+            program.append((entry[0], addresses[entry[1]]) + entry[2:])
+        else:
+            program.append(entry)
+    return program
+
+
+# the parsing machine itself: one loop, no recursion. Backtrack entries snapshot
+# (resume pc, pos, token count, mark count, call depth) so a failure restores the
+# whole machine state with a few truncations. Anything that falls through the opcode
+# chain without continuing is a match failure and takes the shared restore path.
+def run_program(
+    program: List[Tuple], source: str, pos: int = 0
+) -> Optional[Tuple[List[Any], int]]:
+    pc = 0
+    out: List[Any] = []
+    stack: List[Tuple[int, int, int, int, int]] = []
+    marks: List[Tuple[int, int]] = []
+    calls: List[int] = []
+    length = len(source)
+    while True:
+        op = program[pc]
+        code = op[0]
+        if code == OP_CHAR:
+            if pos < length and source[pos] == op[1]:
+                out.append(op[1])
+                pos += 1
+                pc += 1
+                continue
+        elif code == OP_CHARSET:
+            if pos < length and source[pos] in op[1]:
+                out.append(source[pos])
+                pos += 1
+                pc += 1
+                continue
+        elif code == OP_STRING:
+            if source.startswith(op[1], pos):
+                out.append(op[1])
+                pos += op[2]
+                pc += 1
+                continue
+        elif code == OP_ANY_OF:
+            word = None
+            for candidate in op[1]:
+                if source.startswith(candidate, pos):
+                    word = candidate
+                    break
+            if word is not None:
+                out.append(word)
+                pos += len(word)
+                pc += 1
+                continue
+        elif code == OP_REGEX:
+            match = op[1].match(source, pos)
+            if match is not None and match.end() != pos:
+                out.append(match.group(0))
+                pos = match.end()
+                pc += 1
+                continue
+        elif code == OP_SPACES:
+            pos = _spaces_regex.match(source, pos).end()
+            pc += 1
+            continue
+        elif code == OP_CHOICE:
+            stack.append((op[1], pos, len(out), len(marks), len(calls)))
+            pc += 1
+            continue
+        elif code == OP_COMMIT:
+            stack.pop()
+            pc = op[1]
+            continue
+        elif code == OP_PARTIAL_COMMIT:
+            stack[-1] = (stack[-1][0], pos, len(out), len(marks), len(calls))
+            pc = op[1]
+            continue
+        elif code == OP_BACK_COMMIT:
+            _, pos, out_length, marks_length, calls_length = stack.pop()
+            del out[out_length:]
+            del marks[marks_length:]
+            del calls[calls_length:]
+            pc = op[1]
+            continue
+        elif code == OP_CALL:
+            calls.append(pc + 1)
+            pc = op[1]
+            continue
+        elif code == OP_RETURN:
+            pc = calls.pop()
+            continue
+        elif code == OP_MARK:
+            marks.append((pos, len(out)))
+            pc += 1
+            continue
+        elif code == OP_DROP:
+            del out[marks.pop()[1] :]
+            pc += 1
+            continue
+        elif code == OP_SPAN:
+            start, out_length = marks.pop()
+            del out[out_length:]
+            out.append(source[start:pos])
+            pc += 1
+            continue
+        elif code == OP_CONVERT:
+            out_length = marks.pop()[1]
+            try:
+                out[out_length:] = [op[1](out[out_length:])]
+                pc += 1
+                continue
+            except ValueError:
+                pass
+        elif code == OP_FAIL_TWICE:
+            stack.pop()
+        elif code == OP_END:
+            return out, pos
+        # shared failure path: rewind to the most recent choice point or give up
+        if not stack:
+            return None
+        pc, pos, out_length, marks_length, calls_length = stack.pop()
+        del out[out_length:]
+        del marks[marks_length:]
+        del calls[calls_length:]
+
+
+# a machine parser is still a ParserCombinator so it composes and parses like any
+# other; parse_at just runs the program from the given offset.
+class MachineParser(ParserCombinator):
+    __slots__ = ("program",)
+
+    def __init__(self, program: List[Tuple]):
+        self.program = program
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        result = run_program(self.program, source, pos)
         if result is None:
-            return [], input_str
+            return None
+        tokens, new_pos = result
+        if not discard:
+            out.extend(tokens)
+        return new_pos
+
+
+def compile_machine(parser: ParserCombinator) -> MachineParser:
+    return MachineParser(compile_program(parser))
+
+
+_spaces_regex_bytes = re.compile(b" *")
+
+
+# re-encodes a compiled program to run over bytes instead of str. Indexing a str
+# creates (or looks up) a one character string object per position examined; indexing
+# bytes yields a plain int, so the bytes machine compares integers on its hot path and
+# only materializes str tokens from constants prepared here at compile time. Spans are
+# decoded once per capture instead of once per character. Single character matchers
+# must fit in one byte, so those operands are required to be ASCII; the token output
+# stays str for the converters.
+def _encode_program(program: List[Tuple]) -> List[Tuple]:
+    encoded = []
+    for op in program:
+        code = op[0]
+        if code == OP_CHAR:
+            if ord(op[1]) > 127:
+                raise Exception("bytes programs only support ascii letters")
+            encoded.append((OP_CHAR, ord(op[1]), op[1]))
+        elif code == OP_CHARSET:
+            if any(ord(char) > 127 for char in op[1]):
+                raise Exception("bytes programs only support ascii charsets")
+            # one dict lookup does both the membership test and the int -> str token
+            encoded.append((OP_CHARSET, {ord(char): char for char in op[1]}))
+        elif code == OP_STRING:
+            word = op[1].encode()
+            encoded.append((OP_STRING, word, len(word), op[1]))
+        elif code == OP_ANY_OF:
+            encoded.append((OP_ANY_OF, tuple((word.encode(), word) for word in op[1])))
+        elif code == OP_REGEX:
+            encoded.append((OP_REGEX, re.compile(op[1].pattern.encode())))
         else:
+            encoded.append(op)
+    return encoded
+
+
+# the bytes counterpart of run_program; identical control flow, but every source
+# comparison is int against int and every startswith is bytes against bytes
+def run_bytes_program(
+    program: List[Tuple], source: bytes, pos: int = 0
+) -> Optional[Tuple[List[Any], int]]:
+    pc = 0
+    out: List[Any] = []
+    stack: List[Tuple[int, int, int, int, int]] = []
+    marks: List[Tuple[int, int]] = []
+    calls: List[int] = []
+    length = len(source)
+    while True:
+        op = program[pc]
+        code = op[0]
+        if code == OP_CHAR:
+            if pos < length and source[pos] == op[1]:
+                out.append(op[2])
+                pos += 1
+                pc += 1
+                continue
+        elif code == OP_CHARSET:
+            if pos < length:
+                token = op[1].get(source[pos])
+                if token is not None:
+                    out.append(token)
+                    pos += 1
+                    pc += 1
+                    continue
+        elif code == OP_STRING:
+            if source.startswith(op[1], pos):
+                out.append(op[3])
+                pos += op[2]
+                pc += 1
+                continue
+        elif code == OP_ANY_OF:
+            token = None
+            for word, text in op[1]:
+                if source.startswith(word, pos):
+                    token = text
+                    pos += len(word)
+                    break
+            if token is not None:
+                out.append(token)
+                pc += 1
+                continue
+        elif code == OP_REGEX:
+            match = op[1].match(source, pos)
+            if match is not None and match.end() != pos:
+                out.append(match.group(0).decode())
+                pos = match.end()
+                pc += 1
+                continue
+        elif code == OP_SPACES:
+            pos = _spaces_regex_bytes.match(source, pos).end()
+            pc += 1
+            continue
+        elif code == OP_CHOICE:
+            stack.append((op[1], pos, len(out), len(marks), len(calls)))
+            pc += 1
+            continue
+        elif code == OP_COMMIT:
+            stack.pop()
+            pc = op[1]
+            continue
+        elif code == OP_PARTIAL_COMMIT:
+            stack[-1] = (stack[-1][0], pos, len(out), len(marks), len(calls))
+            pc = op[1]
+            continue
+        elif code == OP_BACK_COMMIT:
+            _, pos, out_length, marks_length, calls_length = stack.pop()
+            del out[out_length:]
+            del marks[marks_length:]
+            del calls[calls_length:]
+            pc = op[1]
+            continue
+        elif code == OP_CALL:
+            calls.append(pc + 1)
+            pc = op[1]
+            continue
+        elif code == OP_RETURN:
+            pc = calls.pop()
+            continue
+        elif code == OP_MARK:
+            marks.append((pos, len(out)))
+            pc += 1
+            continue
+        elif code == OP_DROP:
+            del out[marks.pop()[1] :]
+            pc += 1
+            continue
+        elif code == OP_SPAN:
+            start, out_length = marks.pop()
+            del out[out_length:]
+            out.append(source[start:pos].decode())
+            pc += 1
+            continue
+        elif code == OP_CONVERT:
+            out_length = marks.pop()[1]
+            try:
+                out[out_length:] = [op[1](out[out_length:])]
+                pc += 1
+                continue
+            except ValueError:
+                pass
+        elif code == OP_FAIL_TWICE:
+            stack.pop()
+        elif code == OP_END:
+            return out, pos
+        if not stack:
+            return None
+        pc, pos, out_length, marks_length, calls_length = stack.pop()
+        del out[out_length:]
+        del marks[marks_length:]
+        del calls[calls_length:]
+
+
+# lib_fast.pyx is the same loop with the machine registers typed as C integers
+# (build in place with: cythonize -i lib_fast.pyx). The compiled kernel is a drop-in
+# replacement, so use it when the build exists and keep the pure Python loop otherwise.
+try:
+    from lib_fast import run_bytes_program
+except ImportError:
+    pass
+
+
+# runs the bytes machine behind the ordinary str combinator interface: the source is
+# encoded once per parse. Offsets are byte offsets, which for ascii input (all the
+# grammars here) are the same as character offsets.
+class BytesMachineParser(ParserCombinator):
+    __slots__ = ("program",)
+
+    def __init__(self, program: List[Tuple]):
+        self.program = program
+
+    def parse_at(
+        self, source: str, pos: int, out: List[Any], discard: bool = False
+    ) -> Optional[int]:
+        data = source.encode() if isinstance(source, str) else source
+        result = run_bytes_program(self.program, data, pos)
+        if result is None:
             return None
+        tokens, new_pos = result
+        if not discard:
+            out.extend(tokens)
+        return new_pos
+
+
+def compile_bytes_machine(parser: ParserCombinator) -> BytesMachineParser:
+    return BytesMachineParser(_encode_program(compile_program(parser)))
 
 
 # below are functions that convert a list of tokens to a token.
@@ -204,15 +1536,26 @@ class NotParser(ParserCombinator):
 # to turn those lists of letters
 
 
+# rejection errors are pre-constructed once at import: raising on unexpected tokens
+# used to format an f-string per rejection, and ConvertToType now treats ValueError as
+# a plain parse failure (the alternatives backtrack), so the message never needs the
+# offending tokens in it. returning None could not signal failure here because None is
+# the legitimate token null_to_none produces.
+_bad_dict_error = ValueError("cannot convert tokens to dict")
+_bad_bool_error = ValueError("cannot convert token to bool")
+_bad_string_error = ValueError("cannot convert tokens to string")
+_bad_null_error = ValueError("cannot convert token to None")
+
+
 def tokens_to_dict(input_tokens: List[JSON]) -> Dict[str, JSON]:
     if len(input_tokens) % 2 != 0:
-        raise Exception("Must have an even number of tokens to convert to Dict")
+        raise _bad_dict_error
     i = 0
     acc = {}
     while i < len(input_tokens):
         key = input_tokens[i]
         if not isinstance(key, str):
-            raise Exception("every even index of token must be a string")
+            raise _bad_dict_error
         value = input_tokens[i + 1]
         acc[key] = value
         i += 2
@@ -221,32 +1564,28 @@ def tokens_to_dict(input_tokens: List[JSON]) -> Dict[str, JSON]:
 
 def string_to_bool(input_tokens: List[str]) -> bool:
     if len(input_tokens) != 1:
-        raise Exception("This conversion function is designed to convert one token")
+        raise _bad_bool_error
     input_str = input_tokens[0]
     if input_str == "true":
         return True
     elif input_str == "false":
         return False
     else:
-        raise Exception(
-            f"Invalid bool conversion cannot convert {input_str} to boolean"
-        )
+        raise _bad_bool_error
 
 
 def serialize_string_in_string(input_tokens: List[str]) -> str:
     if input_tokens[0] == input_tokens[-1] and input_tokens[0] == '"':
         return "".join(input_tokens[1:-1])
     else:
-        raise Exception(
-            f"cannot turn {input_tokens} into string, must contain quotes in the string itself"
-        )
+        raise _bad_string_error
 
 
 def null_to_none(input_tokens: List[str]) -> None:
     if len(input_tokens) != 1:
-        raise Exception("this function can only convert 1 token")
+        raise _bad_null_error
     input_str = input_tokens[0]
     if input_str == "null":
         return None
     else:
-        raise Exception(f"Cannot convert {input_str} to None")
+        raise _bad_null_error
@@ -0,0 +1,148 @@
+# cython: language_level=3
+# optional compiled kernel for the bytes parsing machine in lib.py. This is the same
+# run_bytes_program loop with the machine registers typed as C integers, so the
+# opcode dispatch, position arithmetic and byte compares run without boxing. Build in
+# place with:
+#
+#     cythonize -i lib_fast.pyx
+#
+# lib.py imports this module if the build exists and silently falls back to the pure
+# Python loop if it does not, so building it is never required.
+import re
+
+cdef int OP_CHAR = 0
+cdef int OP_CHARSET = 1
+cdef int OP_STRING = 2
+cdef int OP_ANY_OF = 3
+cdef int OP_REGEX = 4
+cdef int OP_SPACES = 5
+cdef int OP_CHOICE = 6
+cdef int OP_COMMIT = 7
+cdef int OP_PARTIAL_COMMIT = 8
+cdef int OP_BACK_COMMIT = 9
+cdef int OP_FAIL = 10
+cdef int OP_FAIL_TWICE = 11
+cdef int OP_CALL = 12
+cdef int OP_RETURN = 13
+cdef int OP_MARK = 14
+cdef int OP_DROP = 15
+cdef int OP_SPAN = 16
+cdef int OP_CONVERT = 17
+cdef int OP_END = 18
+
+_spaces_regex_bytes = re.compile(b" *")
+
+
+def run_bytes_program(list program, bytes source, Py_ssize_t pos=0):
+    cdef Py_ssize_t pc = 0
+    cdef Py_ssize_t length = len(source)
+    cdef Py_ssize_t out_length, marks_length, calls_length, start
+    cdef int code
+    cdef list out = []
+    cdef list stack = []
+    cdef list marks = []
+    cdef list calls = []
+    cdef tuple op
+    while True:
+        op = program[pc]
+        code = op[0]
+        if code == OP_CHAR:
+            if pos < length and source[pos] == <int> op[1]:
+                out.append(op[2])
+                pos += 1
+                pc += 1
+                continue
+        elif code == OP_CHARSET:
+            if pos < length:
+                token = op[1].get(source[pos])
+                if token is not None:
+                    out.append(token)
+                    pos += 1
+                    pc += 1
+                    continue
+        elif code == OP_STRING:
+            if source.startswith(op[1], pos):
+                out.append(op[3])
+                pos += <Py_ssize_t> op[2]
+                pc += 1
+                continue
+        elif code == OP_ANY_OF:
+            token = None
+            for word, text in op[1]:
+                if source.startswith(word, pos):
+                    token = text
+                    pos += len(<bytes> word)
+                    break
+            if token is not None:
+                out.append(token)
+                pc += 1
+                continue
+        elif code == OP_REGEX:
+            match = op[1].match(source, pos)
+            if match is not None and match.end() != pos:
+                out.append(match.group(0).decode())
+                pos = match.end()
+                pc += 1
+                continue
+        elif code == OP_SPACES:
+            pos = _spaces_regex_bytes.match(source, pos).end()
+            pc += 1
+            continue
+        elif code == OP_CHOICE:
+            stack.append((op[1], pos, len(out), len(marks), len(calls)))
+            pc += 1
+            continue
+        elif code == OP_COMMIT:
+            stack.pop()
+            pc = op[1]
+            continue
+        elif code == OP_PARTIAL_COMMIT:
+            stack[-1] = (stack[-1][0], pos, len(out), len(marks), len(calls))
+            pc = op[1]
+            continue
+        elif code == OP_BACK_COMMIT:
+            _, pos, out_length, marks_length, calls_length = stack.pop()
+            del out[out_length:]
+            del marks[marks_length:]
+            del calls[calls_length:]
+            pc = op[1]
+            continue
+        elif code == OP_CALL:
+            calls.append(pc + 1)
+            pc = op[1]
+            continue
+        elif code == OP_RETURN:
+            pc = calls.pop()
+            continue
+        elif code == OP_MARK:
+            marks.append((pos, len(out)))
+            pc += 1
+            continue
+        elif code == OP_DROP:
+            del out[marks.pop()[1]:]
+            pc += 1
+            continue
+        elif code == OP_SPAN:
+            start, out_length = marks.pop()
+            del out[out_length:]
+            out.append(source[start:pos].decode())
+            pc += 1
+            continue
+        elif code == OP_CONVERT:
+            out_length = marks.pop()[1]
+            try:
+                out[out_length:] = [op[1](out[out_length:])]
+                pc += 1
+                continue
+            except ValueError:
+                pass
+        elif code == OP_FAIL_TWICE:
+            stack.pop()
+        elif code == OP_END:
+            return out, pos
+        if not stack:
+            return None
+        pc, pos, out_length, marks_length, calls_length = stack.pop()
+        del out[out_length:]
+        del marks[marks_length:]
+        del calls[calls_length:]
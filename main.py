@@ -1,7 +1,13 @@
-from functools import reduce
+import re
 
 from lib import (
     LetterParser,
+    StringParser,
+    SkipSpaces,
+    AnyOfStringsParser,
+    SpanParser,
+    RegexParser,
+    SepByParser,
     RepeatParser,
     IgnoreParser,
     ConvertToType,
@@ -14,19 +20,17 @@ from lib import (
     NotParser,
 )
 
-WordParser = lambda word: ConvertToType(
-    reduce(lambda acc, x: acc + x, [LetterParser(letter) for letter in word]),
-    lambda tokens: reduce(lambda acc, x: acc + x, tokens),
-)
+# a word is matched in one startswith call and is its own token, so no per-letter
+# composition and no token-joining conversion pass
+WordParser = StringParser
 numbers = "1234567890"
 zero_parser = LetterParser("0")
 # multiple zeros not allowed in json spec for ints and for floats you can't have multiple zeros on the left side of
 # the "."
 # so 0000.493 is illegal, 000000 is illegal and 0. is illegal, but 0.0 is legal, 0 is legal.
 multiple_zero_parser = zero_parser + RepeatParser(zero_parser)
-a_bunch_of_number_parsers = [LetterParser(i) for i in numbers]
-any_number_parser = reduce(lambda acc, x: acc * x, a_bunch_of_number_parsers)
-whole_number_parser = RepeatParser(any_number_parser)
+# a digit run is one C-level regex scan instead of one parser call per digit
+whole_number_parser = RegexParser(r"\d+")
 sign_parser = OptionalParser(LetterParser("-"))
 exponent_parser = (
     NotParser(multiple_zero_parser)  # 0000 invalid
@@ -35,50 +39,47 @@ exponent_parser = (
 )
 mantissa_parser = whole_number_parser
 dot_parser = LetterParser(".")
-space_parser = OptionalParser(IgnoreParser(RepeatParser(LetterParser(" "))))
+space_parser = SkipSpaces()
 raw_float_parser_no_spaces = (
     sign_parser + exponent_parser + dot_parser + mantissa_parser
 )
+# numbers are captured as one span of the source and converted directly, instead of
+# collecting a single-character token per digit and joining them back together
 float_parser_no_spaces = ConvertToType(
-    raw_float_parser_no_spaces, lambda x: float("".join(x))
+    SpanParser(raw_float_parser_no_spaces), lambda x: float(x[0])
 )
 float_parser = ConvertToType(
-    space_parser + raw_float_parser_no_spaces + space_parser,
-    lambda x: float("".join(x)),
+    space_parser + SpanParser(raw_float_parser_no_spaces) + space_parser,
+    lambda x: float(x[0]),
 )
 int_parser = ConvertToType(
-    space_parser + exponent_parser + space_parser, lambda x: int("".join(x))
+    space_parser + SpanParser(exponent_parser) + space_parser, lambda x: int(x[0])
 )
 e_parser = LetterParser("e") * LetterParser("E")
 e_notation_parser = ConvertToType(
     space_parser
-    + ConvertToType(raw_float_parser_no_spaces, lambda x: "".join(x))
-    + e_parser
-    + ConvertToType(sign_parser + whole_number_parser, lambda x: "".join(x))
+    + SpanParser(
+        raw_float_parser_no_spaces + e_parser + sign_parser + whole_number_parser
+    )
     + space_parser,
-    lambda x: float("".join(x)),
+    lambda x: float(x[0]),
 )
 number_parser = e_notation_parser * float_parser * int_parser
 bool_parser = ConvertToType(
-    space_parser + (WordParser("true") * WordParser("false")) + space_parser,
+    space_parser + AnyOfStringsParser(["true", "false"]) + space_parser,
     string_to_bool,
 )
 letters = "abcdefghijklmnopqrstuvwxyz"
 upper_case = letters.upper()
 symbols = "!@#$%^&*()-+[]{};'<>,./? "
-string_content_letter_parsers = [
-    LetterParser(i) for i in letters + upper_case + symbols
-]
-string_content_parser = (
-    WordParser('\\"')
-    * reduce(lambda acc, x: x * acc, string_content_letter_parsers)
-    * any_number_parser
+string_content_parser = WordParser('\\"') * RegexParser(
+    "[" + re.escape(letters + upper_case + symbols + numbers) + "]+"
 )
 quote_parser = LetterParser('"')
 string_parser = ConvertToType(
     space_parser
     + quote_parser
-    + OptionalParser(RepeatParser(string_content_parser))
+    + SpanParser(OptionalParser(RepeatParser(string_content_parser)))
     + quote_parser
     + space_parser,
     serialize_string_in_string,
@@ -99,8 +100,8 @@ json_parser = LazyParser(
     + space_parser
 )
 array_element_parser = OptionalParser(
-    RepeatParser(json_parser + IgnoreParser(LetterParser(",")))
-) + OptionalParser(json_parser)
+    SepByParser(json_parser, IgnoreParser(LetterParser(",")))
+)
 array_parser = ConvertToType(
     space_parser
     + IgnoreParser(LetterParser("["))
@@ -119,12 +120,9 @@ object_element_parser = (
     + json_parser
     + space_parser
 )
-object_element_parser_with_comma = (
-    object_element_parser + IgnoreParser(LetterParser(",")) + space_parser
+full_object_element_parser = SepByParser(
+    object_element_parser, IgnoreParser(LetterParser(",")) + space_parser
 )
-full_object_element_parser = (
-    RepeatParser(object_element_parser_with_comma) + object_element_parser
-) * object_element_parser
 object_parser = ConvertToType(
     space_parser
     + IgnoreParser(LetterParser("{"))